@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Shared JSON loading and saving for the workflow scripts.
+Parses with orjson when it is installed, then ujson, then the standard library json module,
+and exposes ijson (when installed) for streaming large documents.
+"""
+
+import json
+import mmap
+import os
+from contextlib import contextmanager
+
+try:
+    import orjson
+except ImportError:  # Optional: roughly 3-5x faster parsing and serialization
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # Optional: faster parsing where orjson's wheel is unavailable (e.g. PyPy)
+    ujson = None
+
+try:
+    import ijson
+except ImportError:  # Optional: stream array items instead of loading the whole file
+    ijson = None
+
+# Errors raised for malformed input by whichever parser loads() uses, or by ijson
+# (ujson's JSONDecodeError is a plain ValueError alias, absent in old releases)
+JSON_ERRORS = (json.JSONDecodeError,)
+if orjson is None and ujson is not None:
+    JSON_ERRORS += (getattr(ujson, 'JSONDecodeError', ValueError),)
+if ijson is not None:
+    JSON_ERRORS += (ijson.JSONError,)
+
+# Whitespace bytes allowed around a JSON document (RFC 8259)
+JSON_WHITESPACE = b' \t\n\r'
+
+def has_object_bounds(buf):
+    """Check without parsing that the first and last non-whitespace bytes are '{' and '}'."""
+    start, end = 0, len(buf)
+    while start < end and buf[start] in JSON_WHITESPACE:
+        start += 1
+    while end > start and buf[end - 1] in JSON_WHITESPACE:
+        end -= 1
+    return end - start >= 2 and buf[start:start + 1] == b'{' and buf[end - 1:end] == b'}'
+
+def loads(buf):
+    """Parse a JSON document from bytes, str or a memory-mapped file."""
+    if isinstance(buf, mmap.mmap):
+        if orjson is not None:
+            # orjson parses straight from the mapped pages, without a bytes copy of the file
+            with memoryview(buf) as view:
+                return orjson.loads(view)
+        buf = bytes(buf)
+    if orjson is not None:
+        return orjson.loads(buf)
+    if ujson is not None:
+        return ujson.loads(buf)
+    return json.loads(buf)
+
+def load_json(filename):
+    """Load and parse a JSON file."""
+    with open(filename, 'rb') as f:
+        return loads(f.read())
+
+@contextmanager
+def map_file(f):
+    """Map an open binary file read-only (empty files cannot be mapped and give b'')."""
+    if os.fstat(f.fileno()).st_size == 0:
+        yield b''
+        return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield mm
+
+def load_mapped(f):
+    """Parse JSON from an open binary file through a read-only memory map of it."""
+    with map_file(f) as buf:
+        return loads(buf)
+
+def track_keys(events, keys, arrays=None):
+    """Pass ijson parse events through, adding each object's keys to keys[prefix] and array prefixes to arrays."""
+    for prefix, event, value in events:
+        if event == 'map_key':
+            if prefix in keys:
+                keys[prefix].add(value)
+        elif event == 'start_array' and arrays is not None:
+            arrays.add(prefix)
+        yield prefix, event, value
+
+def dump_json(data, filename):
+    """Save data as UTF-8 JSON indented by 2 spaces."""
+    if orjson is not None:
+        encoded = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        # json.dump with indent issues many small writes; encode once and write in bulk
+        encoded = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    with open(filename, 'wb') as f:
+        f.write(encoded)
@@ -3,9 +3,20 @@
 Step 2: Verify that the JSON file is valid
 """
 
-import json
 import sys
 
+import json_utils
+
+REQUIRED_FIELDS = ('state', 'state_abbr', 'capital', 'address_line_1', 'city', 'zip_code_5')
+REQUIRED_FIELDS_SET = frozenset(REQUIRED_FIELDS)
+
+# Fields that must not be blank, with the problem reported when they are
+CRITICAL_FIELDS = (
+    ('state', 'empty state name'),
+    ('capital', 'empty capital name'),
+    ('address_line_1', 'empty address')
+)
+
 def verify_json_file(filename):
     """Verify that the JSON file is valid and has correct structure."""
     
@@ -13,38 +24,70 @@ def verify_json_file(filename):
     print(f"Checking file: {filename}")
     
     try:
-        # Test 1: Can we load the JSON file?
-        with open(filename, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Test 1: Can we parse the JSON file? States are streamed one at a time
+        # when ijson is available, so the file is never held in memory at once.
+        states_count = 0
+        sample_state = None
+        missing_fields = []
+        empty_fields = []
+        
+        with open(filename, 'rb') as f:
+            if json_utils.ijson is not None:
+                root_keys = set()
+                events = json_utils.track_keys(json_utils.ijson.parse(f), {'': root_keys})
+                states = json_utils.ijson.items(events, 'states.item')
+            else:
+                data = json_utils.load_mapped(f)
+                # Only an object root has sections and only a states list has
+                # records, matching what the streaming path can see
+                root_keys = data if isinstance(data, dict) else {}
+                states = root_keys.get('states')
+                if not isinstance(states, list):
+                    states = []
+            
+            for i, state in enumerate(states):
+                states_count += 1
+                if sample_state is None:
+                    sample_state = state
+                
+                # Test 4: Check required fields in each state (one set difference,
+                # reported in the canonical field order); a record that is not an
+                # object has none of them and nothing further to check
+                if not isinstance(state, dict):
+                    missing_fields.extend(f"State {i+1}: missing {field}" for field in REQUIRED_FIELDS)
+                    continue
+                missing = REQUIRED_FIELDS_SET.difference(state)
+                if missing:
+                    missing_fields.extend(
+                        f"State {i+1}: missing {field}" for field in REQUIRED_FIELDS if field in missing
+                    )
+                
+                # Test 5: Check for empty critical fields (the state name is
+                # only formatted when there is a problem to report); a missing or
+                # null field counts as empty, since this runs on every record
+                for field, problem in CRITICAL_FIELDS:
+                    if not (state.get(field) or '').strip():
+                        empty_fields.append(f"{state.get('state', f'State {i+1}')}: {problem}")
+        
         print("✅ JSON syntax is valid")
         
         # Test 2: Does it have the expected structure?
-        if 'metadata' not in data:
+        if 'metadata' not in root_keys:
             print("❌ Missing 'metadata' section")
             return False
         print("✅ Metadata section found")
         
-        if 'states' not in data:
+        if 'states' not in root_keys:
             print("❌ Missing 'states' section")
             return False
         print("✅ States section found")
         
         # Test 3: Do we have 50 states?
-        states_count = len(data['states'])
         if states_count != 50:
             print(f"❌ Expected 50 states, found {states_count}")
             return False
         print(f"✅ Correct number of states: {states_count}")
         
-        # Test 4: Check required fields in each state
-        required_fields = ['state', 'state_abbr', 'capital', 'address_line_1', 'city', 'zip_code_5']
-        missing_fields = []
-        
-        for i, state in enumerate(data['states']):
-            for field in required_fields:
-                if field not in state:
-                    missing_fields.append(f"State {i+1}: missing {field}")
-        
         if missing_fields:
             print("❌ Missing required fields:")
             for missing in missing_fields[:5]:  # Show first 5 errors
@@ -52,17 +95,6 @@ def verify_json_file(filename):
             return False
         print("✅ All required fields present")
         
-        # Test 5: Check for empty critical fields
-        empty_fields = []
-        for i, state in enumerate(data['states']):
-            state_name = state.get('state', f'State {i+1}')
-            if not state.get('state', '').strip():
-                empty_fields.append(f"{state_name}: empty state name")
-            if not state.get('capital', '').strip():
-                empty_fields.append(f"{state_name}: empty capital name")
-            if not state.get('address_line_1', '').strip():
-                empty_fields.append(f"{state_name}: empty address")
-        
         if empty_fields:
             print("❌ Found empty critical fields:")
             for empty in empty_fields[:5]:
@@ -70,8 +102,7 @@ def verify_json_file(filename):
             return False
         print("✅ No empty critical fields")
         
-        # Test 6: Quick data sample check
-        sample_state = data['states'][0]  # Check first state (Alabama)
+        # Test 6: Quick data sample check (first state should be Alabama)
         if sample_state['state'] == 'Alabama' and sample_state['capital'] == 'Montgomery':
             print("✅ Data sample verification passed")
         else:
@@ -87,7 +118,7 @@ def verify_json_file(filename):
     except FileNotFoundError:
         print(f"❌ File not found: {filename}")
         return False
-    except json.JSONDecodeError as e:
+    except json_utils.JSON_ERRORS as e:
         print(f"❌ JSON parsing error: {e}")
         return False
     except Exception as e:
@@ -4,17 +4,148 @@ Step 3: Add longitude and latitude coordinates to the JSON file
 This script reads the JSON file and adds geographic coordinates to each state capital.
 """
 
-import json
+import math
+import os
 import requests
+import shelve
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from urllib.parse import urlsplit
 
-def geocode_address_nominatim(address, city, state, zip_code):
+import json_utils
+
+# Offline ZIP -> coordinates table (ZCTA centroids keyed by 5-digit ZIP)
+ZIP_TABLE_FILE = 'data/us_zips.json'
+
+# Persistent cache of successful Nominatim results, keyed by normalized address.
+# It doubles as the checkpoint for interrupted runs.
+GEOCODE_CACHE_FILE = 'data/.geocode_cache'
+
+# Nominatim search endpoint; set NOMINATIM_URL to use a self-hosted server
+NOMINATIM_PUBLIC_HOST = 'nominatim.openstreetmap.org'
+NOMINATIM_PUBLIC_URL = f'https://{NOMINATIM_PUBLIC_HOST}/search'
+NOMINATIM_URL = os.environ.get('NOMINATIM_URL', NOMINATIM_PUBLIC_URL)
+
+def env_number(name, default, convert, minimum):
+    """Read a numeric setting from the environment, keeping the default if it is invalid."""
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        value = convert(raw)
+        if not math.isfinite(value):
+            raise ValueError(raw)
+    except ValueError:
+        print(f"⚠️  Ignoring invalid {name}={raw!r}; using {default}")
+        return default
+    return max(value, minimum)
+
+# The public server requires at least 1 second between requests and limits bulk
+# geocoding to a single thread. A self-hosted server sets its own pace through
+# NOMINATIM_MIN_INTERVAL (seconds, 0 = no limit) and NOMINATIM_WORKERS.
+# The host is compared, so any scheme, path or trailing slash on the public
+# server still gets the public limits.
+if urlsplit(NOMINATIM_URL).hostname == NOMINATIM_PUBLIC_HOST:
+    NOMINATIM_MIN_INTERVAL = 1.2  # 1.2 seconds to be safe
+    NOMINATIM_MAX_WORKERS = 1
+else:
+    NOMINATIM_MIN_INTERVAL = env_number('NOMINATIM_MIN_INTERVAL', 1.2, float, 0.0)
+    NOMINATIM_MAX_WORKERS = env_number('NOMINATIM_WORKERS', 4, int, 1)
+
+# shelve is not thread-safe, so cache access from worker threads is serialized
+_cache_lock = threading.Lock()
+
+# One HTTP session per worker thread, so connections to Nominatim are kept alive
+_thread_local = threading.local()
+
+def load_zip_table(filename=ZIP_TABLE_FILE):
+    """Load the offline ZIP lookup table, or an empty table if it is not available."""
+    if not os.path.exists(filename):
+        return {}
+    try:
+        zip_table = json_utils.load_json(filename)
+    except Exception as e:
+        print(f"❌ Failed to load offline ZIP table {filename}: {e}")
+        print("Falling back to Nominatim for all addresses")
+        return {}
+    if not isinstance(zip_table, dict):
+        print(f"❌ Offline ZIP table {filename} is not a JSON object keyed by ZIP code")
+        print("Falling back to Nominatim for all addresses")
+        return {}
+    return zip_table
+
+def lookup_zip(zip_table, zip_code):
+    """Get coordinates for a 5-digit ZIP code from the offline ZCTA table."""
+    record = zip_table.get(zip_code)
+    if record is None:
+        return {
+            'success': False,
+            'error': f'ZIP {zip_code} not found in offline table',
+            'source': 'zcta'
+        }
+    try:
+        latitude = round(float(record['latitude']), 6)
+        longitude = round(float(record['longitude']), 6)
+    except (KeyError, TypeError, ValueError) as e:
+        return {
+            'success': False,
+            'error': f'Malformed offline table entry for ZIP {zip_code}: {e!r}',
+            'source': 'zcta'
+        }
+    return {
+        'success': True,
+        'latitude': latitude,
+        'longitude': longitude,
+        'source': 'zcta'
+    }
+
+class RateLimiter:
+    """Spaces out request start times by a minimum interval across threads."""
+    
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+    
+    def wait(self):
+        """Reserve the next free request slot and sleep until it starts."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+nominatim_rate_limiter = RateLimiter(NOMINATIM_MIN_INTERVAL)
+
+def get_session():
+    """Return the current thread's requests.Session, creating it on first use."""
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update({
+            'User-Agent': 'StateCapitalsProject/1.0 (Educational Research)'
+        })
+        _thread_local.session = session
+    return session
+
+def geocode_address_nominatim(address, city, state, zip_code, cache=None):
     """Get coordinates using Nominatim (OpenStreetMap) geocoding service."""
     
     # Build address string for better geocoding results
     full_address = f"{address}, {city}, {state} {zip_code}, USA"
     
+    # Reuse a previous successful result for the same address
+    cache_key = '|'.join(part.strip().upper() for part in (address, city, state, zip_code))
+    if cache is not None:
+        with _cache_lock:
+            cached_result = cache.get(cache_key)
+        if cached_result is not None:
+            print(f"        Cached: {full_address}")
+            return dict(cached_result, cached=True)
+    
     # Nominatim API parameters
     params = {
         'q': full_address,
@@ -24,17 +155,13 @@ def geocode_address_nominatim(address, city, state, zip_code):
         'addressdetails': 1
     }
     
-    headers = {
-        'User-Agent': 'StateCapitalsProject/1.0 (Educational Research)'
-    }
-    
     try:
+        nominatim_rate_limiter.wait()
         print(f"        Geocoding: {full_address}")
         
-        response = requests.get(
-            'https://nominatim.openstreetmap.org/search',
+        response = get_session().get(
+            NOMINATIM_URL,
             params=params,
-            headers=headers,
             timeout=15
         )
         
@@ -47,13 +174,19 @@ def geocode_address_nominatim(address, city, state, zip_code):
                 
                 # Validate coordinates are reasonable for US
                 if 18.0 <= latitude <= 72.0 and -180.0 <= longitude <= -66.0:
-                    return {
+                    geocode_result = {
                         'success': True,
                         'latitude': round(latitude, 6),
                         'longitude': round(longitude, 6),
                         'source': 'nominatim',
                         'display_name': result.get('display_name', '')
                     }
+                    if cache is not None:
+                        # Flush each result so an interrupted run resumes from the cache
+                        with _cache_lock:
+                            cache[cache_key] = geocode_result
+                            cache.sync()
+                    return geocode_result
                 else:
                     return {
                         'success': False,
@@ -89,37 +222,88 @@ def add_coordinates_to_json(input_file, output_file):
     
     # Load input file
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = json_utils.load_json(input_file)
         print(f"✅ Loaded input file successfully")
     except Exception as e:
         print(f"❌ Failed to load input file: {e}")
         return 0, 0
     
-    enhanced_data = data.copy()
+    zip_table = load_zip_table()
+    
+    states = data['states']
+    total_states = len(states)
     successful_geocodes = 0
     failed_geocodes = 0
     failed_addresses = []
+    offline_lookups = 0
+    cached_lookups = 0
+    network_requests = 0
     
-    print(f"\n🌍 Geocoding {len(data['states'])} state capitals...")
-    print("Using Nominatim (OpenStreetMap) geocoding service")
-    print("Rate limit: 1 request per second")
+    print(f"\n🌍 Geocoding {total_states} state capitals...")
+    if zip_table:
+        print(f"Using offline ZIP table ({len(zip_table):,} ZIP codes): {ZIP_TABLE_FILE}")
+    print("Using Nominatim (OpenStreetMap) geocoding service for remaining addresses")
+    if NOMINATIM_MIN_INTERVAL > 0:
+        print(f"Rate limit: 1 request every {NOMINATIM_MIN_INTERVAL:g}s, {NOMINATIM_MAX_WORKERS} worker(s)")
+    else:
+        print(f"Rate limit: none, {NOMINATIM_MAX_WORKERS} worker(s)")
     print("="*60)
     
+    geocode_results = [None] * total_states
+    
+    # Resolve what we can from the offline ZIP table
+    pending = []
+    for i, state_info in enumerate(states):
+        geocode_result = lookup_zip(zip_table, state_info['zip_code_5'])
+        if geocode_result['success']:
+            geocode_results[i] = geocode_result
+            offline_lookups += 1
+        else:
+            # A ZIP that is in the table but unusable points at a table in the wrong shape
+            if state_info['zip_code_5'] in zip_table:
+                print(f"⚠️  {geocode_result['error']}; using Nominatim instead")
+            pending.append(i)
+    
+    # Geocode the rest; with a self-hosted server several workers overlap response
+    # latency, while the shared rate limiter keeps requests within Nominatim's limit.
+    # If geocoding is interrupted, queued requests are cancelled so the
+    # executor does not keep contacting Nominatim before the cache closes.
+    if pending:
+        print(f"Geocoding {len(pending)} addresses with Nominatim...")
+        with shelve.open(GEOCODE_CACHE_FILE) as cache, \
+                ThreadPoolExecutor(max_workers=NOMINATIM_MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(
+                    geocode_address_nominatim,
+                    states[i]['address_line_1'],
+                    states[i]['city'],
+                    states[i]['state_abbr'],
+                    states[i]['zip_code_5'],
+                    cache
+                ): i
+                for i in pending
+            }
+            try:
+                for future in as_completed(futures):
+                    geocode_result = future.result()
+                    geocode_results[futures[future]] = geocode_result
+                    if geocode_result.get('cached'):
+                        cached_lookups += 1
+                    else:
+                        network_requests += 1
+            except BaseException:
+                # Catches KeyboardInterrupt too; requests already running finish
+                for future in futures:
+                    future.cancel()
+                raise
+        print("="*60)
+    
     # Process each state
-    for i, state_info in enumerate(data['states']):
+    for i, (state_info, geocode_result) in enumerate(zip(states, geocode_results)):
         state_name = state_info['state']
         capital = state_info['capital']
         
-        print(f"[{i+1:2d}/50] {state_name} - {capital}")
-        
-        # Get coordinates
-        geocode_result = geocode_address_nominatim(
-            state_info['address_line_1'],
-            state_info['city'],
-            state_info['state_abbr'],
-            state_info['zip_code_5']
-        )
+        print(f"[{i+1:2d}/{total_states}] {state_name} - {capital}")
         
         # Add geocoding result to state data
         if geocode_result['success']:
@@ -140,29 +324,41 @@ def add_coordinates_to_json(input_file, output_file):
             failed_geocodes += 1
             failed_addresses.append(f"{state_name} - {capital}")
             print(f"        ❌ Failed: {geocode_result['error']}")
-        
-        # Rate limiting: Nominatim requires at least 1 second between requests
-        if i < len(data['states']) - 1:  # Don't sleep after the last request
-            print(f"        ⏱️  Waiting 1 second (rate limiting)...")
-            time.sleep(1.2)  # 1.2 seconds to be safe
+    
+    success_rate = successful_geocodes / total_states * 100
+    
+    # Describe the services that actually supplied coordinates (cached results
+    # came from Nominatim on an earlier run)
+    used_nominatim = network_requests + cached_lookups > 0
+    if offline_lookups and used_nominatim:
+        geocoding_service = 'zcta+nominatim'
+        note = "Coordinates added from the offline ZCTA ZIP table, with Nominatim (OpenStreetMap) for the remaining addresses"
+    elif offline_lookups:
+        geocoding_service = 'zcta'
+        note = "Coordinates added from the offline ZCTA ZIP table"
+    else:
+        geocoding_service = 'nominatim'
+        note = "Coordinates added using Nominatim (OpenStreetMap) geocoding service"
     
     # Add geocoding metadata
-    enhanced_data['metadata']['geocoding'] = {
+    data['metadata']['geocoding'] = {
         'geocoding_date': datetime.now().isoformat(),
-        'geocoding_service': 'nominatim',
-        'total_addresses': len(data['states']),
+        'geocoding_service': geocoding_service,
+        'total_addresses': total_states,
         'successful_geocodes': successful_geocodes,
         'failed_geocodes': failed_geocodes,
-        'success_rate': f"{(successful_geocodes / len(data['states']) * 100):.1f}%",
+        'success_rate': f"{success_rate:.1f}%",
         'failed_addresses': failed_addresses,
+        'offline_lookups': offline_lookups,
+        'cached_lookups': cached_lookups,
+        'network_requests': network_requests,
         'step': "Step 3 - Coordinate addition",
-        'note': "Coordinates added using Nominatim (OpenStreetMap) geocoding service"
+        'note': note
     }
     
     # Save enhanced data
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(enhanced_data, f, indent=2, ensure_ascii=False)
+        json_utils.dump_json(data, output_file)
         print(f"\n✅ Output file saved successfully: {output_file}")
     except Exception as e:
         print(f"\n❌ Failed to save output file: {e}")
@@ -171,9 +367,9 @@ def add_coordinates_to_json(input_file, output_file):
     print(f"\n" + "="*60)
     print(f"✅ Step 3 Complete: Coordinates added to JSON file")
     print(f"📊 Results Summary:")
-    print(f"   Successfully geocoded: {successful_geocodes}/{len(data['states'])} addresses")
-    print(f"   Failed geocodes: {failed_geocodes}/{len(data['states'])} addresses")
-    print(f"   Success rate: {(successful_geocodes / len(data['states']) * 100):.1f}%")
+    print(f"   Successfully geocoded: {successful_geocodes}/{total_states} addresses")
+    print(f"   Failed geocodes: {failed_geocodes}/{total_states} addresses")
+    print(f"   Success rate: {success_rate:.1f}%")
     print(f"📁 Output file: {output_file}")
     
     if failed_addresses:
@@ -197,7 +393,6 @@ if __name__ == "__main__":
     output_file = 'data/state_capitals_with_coords.json'
     
     # Check if validated file exists, use it as input
-    import os
     validated_file = 'data/state_capitals_validated.json'
     if os.path.exists(validated_file):
         input_file = validated_file
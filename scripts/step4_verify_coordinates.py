@@ -3,15 +3,15 @@
 Step 4: Verify that the longitude and latitude coordinates are variable
 """
 
-import json
 import math
 
+import json_utils
+
 def calculate_statistics(values):
     """Calculate basic statistics for a list of values."""
     if not values:
         return None
     
-    values_sorted = sorted(values)
     n = len(values)
     
     # Basic stats
@@ -39,18 +39,19 @@ def verify_coordinate_variability(filename):
     print("Step 4: Verifying longitude and latitude coordinate variability...")
     
     # Load the JSON file with coordinates
-    with open(filename, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = json_utils.load_json(filename)
     
-    # Extract coordinates
+    # Extract coordinates, remembering which state each valid pair came from
     latitudes = []
     longitudes = []
+    valid_indices = []
     valid_coordinates = 0
     invalid_coordinates = 0
     
-    print(f"Analyzing coordinates for {len(data['states'])} states...")
+    total_states = len(data['states'])
+    print(f"Analyzing coordinates for {total_states} states...")
     
-    for state_info in data['states']:
+    for i, state_info in enumerate(data['states']):
         state_name = state_info['state']
         lat = state_info.get('latitude')
         lon = state_info.get('longitude')
@@ -64,6 +65,7 @@ def verify_coordinate_variability(filename):
                 if -90 <= lat_float <= 90 and -180 <= lon_float <= 180:
                     latitudes.append(lat_float)
                     longitudes.append(lon_float)
+                    valid_indices.append(i)
                     valid_coordinates += 1
                 else:
                     print(f"⚠️  {state_name}: Coordinates out of valid range: {lat_float}, {lon_float}")
@@ -78,7 +80,7 @@ def verify_coordinate_variability(filename):
     print(f"\n📊 COORDINATE SUMMARY:")
     print(f"   Valid coordinates: {valid_coordinates}")
     print(f"   Invalid/missing coordinates: {invalid_coordinates}")
-    print(f"   Data completeness: {(valid_coordinates / len(data['states']) * 100):.1f}%")
+    print(f"   Data completeness: {(valid_coordinates / total_states * 100):.1f}%")
     
     if valid_coordinates < 2:
         print("❌ Insufficient valid coordinates for variability analysis")
@@ -153,7 +155,7 @@ def verify_coordinate_variability(filename):
     # Overall assessment
     overall_good = (lat_variability_good and lon_variability_good and 
                    lat_std_good and lon_std_good and 
-                   valid_coordinates >= len(data['states']) * 0.9)  # 90% completeness
+                   valid_coordinates >= total_states * 0.9)  # 90% completeness
     
     print(f"\n🎯 OVERALL ASSESSMENT:")
     if overall_good:
@@ -165,16 +167,18 @@ def verify_coordinate_variability(filename):
     
     # Specific examples of extreme coordinates
     if latitudes and longitudes:
-        northernmost_idx = latitudes.index(max(latitudes))
-        southernmost_idx = latitudes.index(min(latitudes))
-        westernmost_idx = longitudes.index(min(longitudes))
-        easternmost_idx = longitudes.index(max(longitudes))
+        # Positions in latitudes/longitudes skip invalid states, so map them back
+        positions = range(valid_coordinates)
+        northernmost_idx = valid_indices[max(positions, key=latitudes.__getitem__)]
+        southernmost_idx = valid_indices[min(positions, key=latitudes.__getitem__)]
+        westernmost_idx = valid_indices[min(positions, key=longitudes.__getitem__)]
+        easternmost_idx = valid_indices[max(positions, key=longitudes.__getitem__)]
         
         print(f"\n📍 EXTREME COORDINATES:")
-        print(f"   Northernmost: {data['states'][northernmost_idx]['state']} ({max(latitudes):.6f}°)")
-        print(f"   Southernmost: {data['states'][southernmost_idx]['state']} ({min(latitudes):.6f}°)")
-        print(f"   Westernmost: {data['states'][westernmost_idx]['state']} ({min(longitudes):.6f}°)")
-        print(f"   Easternmost: {data['states'][easternmost_idx]['state']} ({max(longitudes):.6f}°)")
+        print(f"   Northernmost: {data['states'][northernmost_idx]['state']} ({lat_stats['max']:.6f}°)")
+        print(f"   Southernmost: {data['states'][southernmost_idx]['state']} ({lat_stats['min']:.6f}°)")
+        print(f"   Westernmost: {data['states'][westernmost_idx]['state']} ({lon_stats['min']:.6f}°)")
+        print(f"   Easternmost: {data['states'][easternmost_idx]['state']} ({lon_stats['max']:.6f}°)")
     
     print(f"\n✅ Step 4 Complete: Coordinate variability analysis finished")
     
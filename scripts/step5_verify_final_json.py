@@ -3,197 +3,255 @@
 Step 5: Verify the final JSON file with coordinates
 """
 
-import json
 import os
+import sys
+from itertools import count
+
+import json_utils
+
+# File schema
+ROOT_KEYS = ('metadata', 'states')
+METADATA_KEYS = ('title', 'total_states')
+EXPECTED_TOTAL_STATES = 50
+REQUIRED_FIELDS = (
+    'state', 'state_abbr', 'capital', 'address_line_1',
+    'address_line_2', 'city', 'zip_code_5', 'zip_code_4'
+)
+REQUIRED_FIELDS_SET = frozenset(REQUIRED_FIELDS)
+
+# Completeness ratings indexed by completeness in whole twentieths (5% steps):
+# below 80% POOR, 80% FAIR, 90% GOOD, 95% and up EXCELLENT
+COMPLETENESS_RATINGS = (
+    ("❌ Completeness: POOR",) * 16 +
+    ("⚠️  Completeness: FAIR",) * 2 +
+    ("✅ Completeness: GOOD",) +
+    ("✅ Completeness: EXCELLENT",) * 2
+)
+
+# Only this many validation errors are kept for the report; the rest are counted
+MAX_REPORTED_ERRORS = 10
+
+# States whose coordinates must be present for the file to pass
+ESSENTIAL_STATES = frozenset({'California', 'Texas', 'Florida', 'New York', 'Alaska', 'Hawaii'})
+
+# JSON numbers parse to float (or int when written without a fraction); bool is excluded
+COORDINATE_TYPES = (float, int)
+
+def state_label(i, state):
+    """Name a state in error messages, falling back to its 1-based position."""
+    return state['state'] if 'state' in state else f'State {i+1}'
+
+# check_state returns (status, error, essential): status is 'valid', 'missing' or
+# None (present but out of range), error is a message or None, and essential is
+# (name, has_coordinates) for an essential state, otherwise None
+def check_state(i, state):
+    """Verify one state record, leaving the counting and reporting to the caller."""
+    # Each field is read once through a locally bound get
+    get = state.get
+    lat = get('latitude')
+    lon = get('longitude')
+    has_coordinates = lat is not None and lon is not None
+    
+    # Check for essential states (O(1) set lookup)
+    essential = None
+    name = get('state')
+    if name in ESSENTIAL_STATES:
+        essential = (name, has_coordinates)
+    
+    # Check required fields (one set difference, listed in field order)
+    missing = REQUIRED_FIELDS_SET.difference(state)
+    if missing:
+        missing_fields = [field for field in REQUIRED_FIELDS if field in missing]
+        return None, f"{state_label(i, state)}: Missing fields: {missing_fields}", essential
+    
+    # Check coordinate fields
+    if not has_coordinates:
+        return 'missing', None, essential
+    
+    # Validate coordinate types; step 3 writes coordinates as JSON numbers, so
+    # anything else (strings, booleans, objects) is a malformed record
+    if type(lat) not in COORDINATE_TYPES or type(lon) not in COORDINATE_TYPES:
+        return 'missing', f"{state_label(i, state)}: Invalid coordinate format", essential
+    
+    # Check coordinate ranges with one combined test; only a failing
+    # pair is examined again to report which value is out of range
+    if -90 <= lat <= 90 and -180 <= lon <= 180:
+        return 'valid', None, essential
+    if not (-90 <= lat <= 90):
+        return None, f"{state_label(i, state)}: Invalid latitude: {lat}", essential
+    return None, f"{state_label(i, state)}: Invalid longitude: {lon}", essential
 
 def verify_final_json(filename):
     """Comprehensive verification of the final JSON file with coordinates."""
     
-    print("Step 5: Verifying the final JSON file...")
-    print(f"Checking file: {filename}")
+    # The report is collected here and written to stdout in one call at the end
+    out = []
+    
+    out.append("Step 5: Verifying the final JSON file...")
+    out.append(f"Checking file: {filename}")
     
     try:
-        # Basic file checks
-        if not os.path.exists(filename):
-            print(f"❌ File does not exist: {filename}")
-            return False
+        total_states = 0
+        states_with_coords = 0
+        states_missing_coords = 0
+        validation_errors = []  # The first MAX_REPORTED_ERRORS errors
+        error_count = 0
+        found_essential = []
+        missing_essential = []
         
-        file_size = os.path.getsize(filename)
-        print(f"📁 File size: {file_size:,} bytes ({file_size/1024:.1f} KB)")
+        def add_error(message):
+            nonlocal error_count
+            error_count += 1
+            if len(validation_errors) < MAX_REPORTED_ERRORS:
+                validation_errors.append(message)
         
-        # Load and parse JSON
-        with open(filename, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Parse the file and verify each state record in a single pass. With ijson
+        # the states are streamed one at a time, so the structure checks below
+        # are reported once the pass is complete. A missing file surfaces as
+        # FileNotFoundError from open(), without separate exists/size calls.
+        with open(filename, 'rb') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            out.append(f"📁 File size: {file_size:,} bytes ({file_size/1024:.1f} KB)")
+            
+            # A cheap prescan of the first and last non-whitespace bytes rejects
+            # truncated or corrupt files before any parsing work is done; without
+            # ijson the same read-only memory map is then parsed in full
+            with json_utils.map_file(f) as buf:
+                if not json_utils.has_object_bounds(buf):
+                    out.append("❌ Not a complete JSON object: file must start with '{' and end with '}' (truncated, corrupt or wrong root type)")
+                    return False
+                if json_utils.ijson is None:
+                    data = json_utils.loads(buf)
+            
+            if json_utils.ijson is not None:
+                structure = {'root_keys': set(), 'metadata_keys': set(), 'arrays': set()}
+                keys = {'': structure['root_keys'], 'metadata': structure['metadata_keys']}
+                events = json_utils.track_keys(json_utils.ijson.parse(f, use_float=True), keys, structure['arrays'])
+                states = json_utils.ijson.items(events, 'states.item')
+            else:
+                is_object = isinstance(data, dict)
+                metadata = data.get('metadata') if is_object else None
+                structure = {
+                    'root_keys': set(data) if is_object else set(),
+                    'metadata_keys': set(metadata) if isinstance(metadata, dict) else set(),
+                    'arrays': {'states'} if is_object and isinstance(data.get('states'), list) else set()
+                }
+                states = data['states'] if 'states' in structure['arrays'] else []
+            
+            # Verify each state lazily, so streamed records are checked as they arrive
+            results = map(check_state, count(), states)
+            
+            # Bind the list appends once rather than per record
+            add_found = found_essential.append
+            add_missing = missing_essential.append
+            
+            for status, error, essential in results:
+                total_states += 1
+                if essential is not None:
+                    name, has_coordinates = essential
+                    (add_found if has_coordinates else add_missing)(name)
+                if error is not None:
+                    add_error(error)
+                if status == 'valid':
+                    states_with_coords += 1
+                elif status == 'missing':
+                    states_missing_coords += 1
+            
+            # Release the parsed document before reporting; only counts and
+            # messages are needed from here on
+            data = metadata = states = results = None
         
-        print("✅ JSON syntax is valid")
+        out.append("✅ JSON syntax is valid")
         
         # Structure verification
-        required_root_keys = ['metadata', 'states']
-        for key in required_root_keys:
-            if key not in data:
-                print(f"❌ Missing root key: {key}")
+        for key in ROOT_KEYS:
+            if key not in structure['root_keys']:
+                out.append(f"❌ Missing root key: {key}")
                 return False
-        print("✅ Root structure is valid")
+        out.append("✅ Root structure is valid")
         
         # Metadata verification
-        metadata = data['metadata']
-        expected_metadata_keys = ['title', 'total_states']
-        for key in expected_metadata_keys:
-            if key not in metadata:
-                print(f"❌ Missing metadata key: {key}")
+        for key in METADATA_KEYS:
+            if key not in structure['metadata_keys']:
+                out.append(f"❌ Missing metadata key: {key}")
                 return False
-        print("✅ Metadata structure is valid")
+        out.append("✅ Metadata structure is valid")
         
         # States data verification
-        states = data['states']
-        if not isinstance(states, list):
-            print("❌ States should be a list")
+        if 'states' not in structure['arrays']:
+            out.append("❌ States should be a list")
             return False
         
-        total_states = len(states)
-        expected_total = 50
-        
-        if total_states != expected_total:
-            print(f"❌ Expected {expected_total} states, found {total_states}")
+        if total_states != EXPECTED_TOTAL_STATES:
+            out.append(f"❌ Expected {EXPECTED_TOTAL_STATES} states, found {total_states}")
             return False
-        print(f"✅ Correct number of states: {total_states}")
-        
-        # Individual state verification
-        required_fields = [
-            'state', 'state_abbr', 'capital', 'address_line_1', 
-            'address_line_2', 'city', 'zip_code_5', 'zip_code_4'
-        ]
+        out.append(f"✅ Correct number of states: {total_states}")
         
-        coordinate_fields = ['latitude', 'longitude']
-        
-        states_with_coords = 0
-        states_missing_coords = 0
-        validation_errors = []
-        
-        print(f"\n🔍 Verifying individual state records...")
-        
-        for i, state in enumerate(states):
-            state_name = state.get('state', f'State {i+1}')
-            
-            # Check required fields
-            missing_fields = []
-            for field in required_fields:
-                if field not in state:
-                    missing_fields.append(field)
-            
-            if missing_fields:
-                validation_errors.append(f"{state_name}: Missing fields: {missing_fields}")
-                continue
-            
-            # Check coordinate fields
-            has_coordinates = True
-            for field in coordinate_fields:
-                if field not in state or state[field] is None:
-                    has_coordinates = False
-                    break
-            
-            if has_coordinates:
-                # Validate coordinate values
-                try:
-                    lat = float(state['latitude'])
-                    lon = float(state['longitude'])
-                    
-                    # Check coordinate ranges
-                    if not (-90 <= lat <= 90):
-                        validation_errors.append(f"{state_name}: Invalid latitude: {lat}")
-                        continue
-                    
-                    if not (-180 <= lon <= 180):
-                        validation_errors.append(f"{state_name}: Invalid longitude: {lon}")
-                        continue
-                    
-                    states_with_coords += 1
-                    
-                except (ValueError, TypeError):
-                    validation_errors.append(f"{state_name}: Invalid coordinate format")
-                    states_missing_coords += 1
-            else:
-                states_missing_coords += 1
+        out.append("\n🔍 Verifying individual state records...")
         
         # Report validation results
-        print(f"\n📊 VALIDATION RESULTS:")
-        print(f"   States with valid coordinates: {states_with_coords}")
-        print(f"   States missing/invalid coordinates: {states_missing_coords}")
-        print(f"   Coordinate completeness: {(states_with_coords / total_states * 100):.1f}%")
+        out.append("\n📊 VALIDATION RESULTS:")
+        out.append(f"   States with valid coordinates: {states_with_coords}")
+        out.append(f"   States missing/invalid coordinates: {states_missing_coords}")
+        out.append(f"   Coordinate completeness: {(states_with_coords / total_states * 100):.1f}%")
         
         if validation_errors:
-            print(f"\n❌ Validation errors found:")
-            for error in validation_errors[:10]:  # Show first 10 errors
-                print(f"   • {error}")
-            if len(validation_errors) > 10:
-                print(f"   ... and {len(validation_errors) - 10} more errors")
+            out.append("\n❌ Validation errors found:")
+            for error in validation_errors:
+                out.append(f"   • {error}")
+            if error_count > MAX_REPORTED_ERRORS:
+                out.append(f"   ... and {error_count - MAX_REPORTED_ERRORS} more errors")
         
         # Data quality assessment
-        print(f"\n📈 DATA QUALITY ASSESSMENT:")
+        out.append("\n📈 DATA QUALITY ASSESSMENT:")
         
         # Completeness
         completeness = states_with_coords / total_states
-        if completeness >= 0.95:
-            print(f"   ✅ Completeness: EXCELLENT ({completeness*100:.1f}%)")
-        elif completeness >= 0.90:
-            print(f"   ✅ Completeness: GOOD ({completeness*100:.1f}%)")
-        elif completeness >= 0.80:
-            print(f"   ⚠️  Completeness: FAIR ({completeness*100:.1f}%)")
-        else:
-            print(f"   ❌ Completeness: POOR ({completeness*100:.1f}%)")
-        
-        # Check for essential states
-        essential_states = ['California', 'Texas', 'Florida', 'New York', 'Alaska', 'Hawaii']
-        found_essential = []
-        missing_essential = []
-        
-        for state in states:
-            if state.get('state') in essential_states:
-                if state.get('latitude') is not None and state.get('longitude') is not None:
-                    found_essential.append(state['state'])
-                else:
-                    missing_essential.append(state['state'])
+        rating = COMPLETENESS_RATINGS[states_with_coords * 20 // total_states]
+        out.append(f"   {rating} ({completeness*100:.1f}%)")
         
         if not missing_essential:
-            print(f"   ✅ Essential states: ALL PRESENT with coordinates")
+            out.append("   ✅ Essential states: ALL PRESENT with coordinates")
         else:
-            print(f"   ⚠️  Essential states missing coordinates: {missing_essential}")
+            out.append(f"   ⚠️  Essential states missing coordinates: {missing_essential}")
         
         # Overall file assessment
-        is_valid = (len(validation_errors) == 0 and 
+        is_valid = (error_count == 0 and 
                    states_with_coords >= total_states * 0.90 and  # 90% completeness
                    not missing_essential)
         
         if is_valid:
-            print(f"\n🎉 FINAL VERIFICATION: PASSED")
-            print(f"   ✅ File structure is correct")
-            print(f"   ✅ All required data is present")
-            print(f"   ✅ Coordinates are valid and complete")
-            print(f"   ✅ File is ready for use and distribution")
+            out.append("\n🎉 FINAL VERIFICATION: PASSED")
+            out.append("   ✅ File structure is correct")
+            out.append("   ✅ All required data is present")
+            out.append("   ✅ Coordinates are valid and complete")
+            out.append("   ✅ File is ready for use and distribution")
         else:
-            print(f"\n⚠️  FINAL VERIFICATION: ISSUES FOUND")
-            print(f"   📝 File needs attention before final use")
+            out.append("\n⚠️  FINAL VERIFICATION: ISSUES FOUND")
+            out.append("   📝 File needs attention before final use")
         
         # File summary
-        print(f"\n📋 FILE SUMMARY:")
-        print(f"   Total states: {total_states}")
-        print(f"   States with coordinates: {states_with_coords}")
-        print(f"   File size: {file_size:,} bytes")
-        print(f"   Validation errors: {len(validation_errors)}")
+        out.append("\n📋 FILE SUMMARY:")
+        out.append(f"   Total states: {total_states}")
+        out.append(f"   States with coordinates: {states_with_coords}")
+        out.append(f"   File size: {file_size:,} bytes")
+        out.append(f"   Validation errors: {error_count}")
         
-        print(f"\n✅ Step 5 Complete: Final JSON verification finished")
+        out.append("\n✅ Step 5 Complete: Final JSON verification finished")
         
         return is_valid
         
     except FileNotFoundError:
-        print(f"❌ File not found: {filename}")
+        out.append(f"❌ File does not exist: {filename}")
         return False
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON parsing error: {e}")
+    except json_utils.JSON_ERRORS as e:
+        out.append(f"❌ JSON parsing error: {e}")
         return False
     except Exception as e:
-        print(f"❌ Verification error: {e}")
+        out.append(f"❌ Verification error: {e}")
         return False
+    finally:
+        sys.stdout.write("\n".join(out) + "\n")
 
 if __name__ == "__main__":
     filename = 'data/state_capitals_with_coords.json'